@@ -8,13 +8,54 @@ the assignee and the description. Comments from Zendesk
 are added as comments to Samanage (The author of the comments on Samanage
 will be the account whose Samanage account credentials are used in this code)."""
 
-import json
+import asyncio
+import concurrent.futures
 import math
-import sys
+import random
 import time
 
+import orjson
 import requests
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _parse(response):
+    """Parse a response body as JSON.
+
+    Zendesk and Samanage both return UTF-8 JSON; orjson parses it
+    straight from the raw bytes, with no intermediate decode step
+    that could mangle non-ASCII ticket content."""
+    return orjson.loads(response.content)
+
+
+def _retry_delay(response, attempt):
+    """How long to wait before resending a rate-limited request.
+
+    If Zendesk sent a Retry-After header that is honored as is.
+    Otherwise wait an exponentially growing amount of time capped
+    at 30 seconds, multiplied by a random fraction (full jitter)
+    so parallel workers don't all retry at the same moment."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        return int(retry_after)
+    return random.random() * min(30, 2 ** attempt)
+
+
+# Terms for the status of a ticket on Samanage differ from those on Zendesk.
+# When creating a ticket on Samanage through API only statuses allowed are
+# Closed and New. After the ticket is created status can be changed.
+# Maps the zendesk status to (status at creation, status to set afterwards);
+# unknown statuses such as "hold" fall back to New/Assigned.
+_STATUS_MAP = {
+    "open": ("New", "Assigned"),
+    "pending": ("New", "Assigned"),
+    "closed": ("Closed", "Closed"),
+    "solved": ("Closed", "Closed"),
+}
 
 
 class Samanage(object):
@@ -24,10 +65,15 @@ class Samanage(object):
     which takes username and password."""
     def __init__(self, username, password):
         self.uri = "https://api.samanage.com"
+        self._incidents_url = f"{self.uri}/incidents"
         self.session = requests.Session()
         self.session.auth = requests.auth.HTTPDigestAuth(username, password)
         self.session.headers = {"Accept":"application/vnd.samanage.v1.1+json",
                                 "Content-Type":"application/json"}
+        # Default pool keeps 10 connections; with more callers than that
+        # connections get dropped and TLS is renegotiated every time
+        self.session.mount("https://", requests.adapters.HTTPAdapter(
+            pool_connections=50, pool_maxsize=50))
 
     def incident(self, name, requester, priority, status, assignee, description):
         """Create an incident on Samanage. Name, requestor and priority
@@ -43,8 +89,8 @@ class Samanage(object):
             }
         }
         response = self.session.post(
-            "{0}/incidents.json".format(self.uri),
-            json=payload
+            f"{self._incidents_url}.json",
+            data=orjson.dumps(payload)
         )
         return response.text
 
@@ -52,8 +98,8 @@ class Samanage(object):
         """Create a comment on a Samanage incident."""
         payload = {"comment":{"body":body, "is_private":"false"}}
         response = self.session.post(
-            "{0}/incidents/{1}/comments.json".format(self.uri, incident_id),
-            json=payload
+            f"{self._incidents_url}/{incident_id}/comments.json",
+            data=orjson.dumps(payload)
         )
         return response.status_code
 
@@ -61,8 +107,8 @@ class Samanage(object):
         """Update an incident's state on Samanage."""
         payload = {"incident":{"state": value}}
         response = self.session.put(
-            "{0}/incidents/{1}.json".format(self.uri, incident_id),
-            json=payload
+            f"{self._incidents_url}/{incident_id}.json",
+            data=orjson.dumps(payload)
         )
         return response.status_code
 
@@ -74,20 +120,47 @@ class Zendesk(object):
     or api token. If using api token set token argument to True
     when initalizing class.
 
-    Zendesk returns api calls in html. Responses are
-    read as binary instead and to prevent UnicodeDecodeError
-    are decoded with 'replace' argument."""
+    Response bodies are UTF-8 JSON and are parsed straight from
+    bytes with orjson."""
     def __init__(self, username, password, org, token=False):
         self.username = username
         self.password = password
         self.token = token
-        self.uri = "https://{0}.zendesk.com/api/v2".format(org)
+        self.uri = f"https://{org}.zendesk.com/api/v2"
+        self._tickets_url = f"{self.uri}/tickets"
+        self._users_url = f"{self.uri}/users"
+        self._incremental_url = f"{self.uri}/incremental/tickets/cursor.json"
         self.session = requests.Session()
         if self.token:
             self.session.auth = username+"/token", password
         else:
             self.session.auth = username, password
         self.session.headers = {"Content-Type":"application/json"}
+        # Default pool keeps 10 connections; with more callers than that
+        # connections get dropped and TLS is renegotiated every time
+        self.session.mount("https://", requests.adapters.HTTPAdapter(
+            pool_connections=50, pool_maxsize=50))
+        self._user_cache = {}
+        self._ticket_range = None
+        self._remaining = 999
+
+    def _retryable_get(self, request):
+        """Make a GET request, retrying on 429 with backoff.
+
+        Zendesk reports the remaining quota on every response in
+        X-Rate-Limit-Remaining; when it is nearly used up, pause
+        for a moment instead of running into the 429 round-trip."""
+        response = self.session.get(request)
+        attempts = 0
+        while response.status_code == 429 and attempts < 6:
+            time.sleep(_retry_delay(response, attempts))
+            attempts = attempts + 1
+            response = self.session.get(request)
+        response.raise_for_status()
+        self._remaining = int(response.headers.get("X-Rate-Limit-Remaining", 999))
+        if self._remaining < 10:
+            time.sleep(1.0)
+        return response
 
     def http_call(self, request):
         """Make HTTP GET request to Zendesk.
@@ -100,61 +173,118 @@ class Zendesk(object):
         https://developer.zendesk.com/rest_api/docs/core/introduction#rate-limits
 
         HTTP errors are raised to console."""
-        response = self.session.get(request)
-        attempts = 0
-        while response.status_code == 429:
-            if attempts > 5:
-                break
-            attempts = attempts + 1
-            time.sleep(30)
-            response = self.session.get(request)
-        response.raise_for_status()
-        return response
+        return self._retryable_get(request)
 
     def ticket_range(self):
         """Zendesk returns 100 tickets at a time. With this request we
         can calculate how many times we'd need to make a
-        self.get_list_of_tickets request."""
-        response = self.http_call("{0}/tickets.json".format(self.uri))
-        return math.ceil(response.json()["count"] / 100) + 1
+        self.get_list_of_tickets request.
+
+        Returns the number of pages, so loop with
+        range(1, ticket_range + 1). The count is only fetched once
+        and cached for the rest of the run."""
+        if self._ticket_range is None:
+            response = self.http_call(f"{self._tickets_url}.json")
+            self._ticket_range = math.ceil(_parse(response)["count"] / 100)
+        return self._ticket_range
 
     def get_ticket(self, ticket_id):
         """Get a single ticket from Zendesk using the ticket id."""
-        response = self.http_call("{0}/tickets/{1}.json".format(self.uri, ticket_id))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))
+        response = self.http_call(f"{self._tickets_url}/{ticket_id}.json")
+        return _parse(response)
+
+    def _get_user(self, user_id):
+        """Get a user from Zendesk, caching the result.
+
+        The same assignee shows up on many tickets and the same author
+        on many comments, so each user is only requested once. Users
+        that come back 404 are cached as None so a missing id isn't
+        requested again either."""
+        if user_id in self._user_cache:
+            return self._user_cache[user_id]
+        try:
+            response = self.http_call(f"{self._users_url}/{user_id}.json")
+        except requests.exceptions.HTTPError as error:
+            if error.response.status_code != 404:
+                raise
+            user = None
+        else:
+            user = _parse(response)["user"]
+        self._user_cache[user_id] = user
+        return user
 
     def get_assignee_email(self, assignee_id):
         """Get an assignee email using the assignee id."""
-        response = self.http_call("{0}/users/{1}.json".format(self.uri, assignee_id))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))["user"]["email"]
+        user = self._get_user(assignee_id)
+        return user["email"] if user else None
 
     def get_comments(self, ticket_id):
         """Get all the comments on a ticket using the ticket id."""
-        response = self.http_call("{0}/tickets/{1}/comments.json".format(self.uri, ticket_id))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))
+        response = self.http_call(f"{self._tickets_url}/{ticket_id}/comments.json")
+        return _parse(response)
 
     def get_list_of_tickets(self, page=1):
         """Get a list of tickets up to 100. Page argument used to view next 100."""
-        response = self.http_call("{0}/tickets.json?page={1}".format(self.uri, page))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))
+        response = self.http_call(f"{self._tickets_url}.json?page={page}")
+        return _parse(response)
 
     def get_comment_author(self, author_id):
         """Get the author of a comment using the author id."""
-        response = self.http_call("{0}/users/{1}.json".format(self.uri, author_id))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))["user"]["name"]
+        user = self._get_user(author_id)
+        return user["name"] if user else None
 
     def get_many_tickets(self, tickets):
         """Get many tickets from zendesk. Up to 100."""
-        response = self.http_call("{0}/tickets/show_many.json?ids={1}".format(self.uri, tickets))
-        return json.loads(response.content.decode(sys.stdout.encoding, "replace"))
+        response = self.http_call(f"{self._tickets_url}/show_many.json?ids={tickets}")
+        return _parse(response)
+
+    def get_many_users(self, users):
+        """Get many users from zendesk. Up to 100.
+
+        Fetched users go into the user cache, so following
+        get_assignee_email / get_comment_author calls for them
+        are plain dict lookups."""
+        response = self.http_call(f"{self._users_url}/show_many.json?ids={users}")
+        users = _parse(response)["users"]
+        for user in users:
+            self._user_cache[user["id"]] = user
+        return users
+
+    def prefetch_users(self, user_ids):
+        """Load a batch of users into the cache with one
+        show_many request per 100 ids instead of one request each.
+
+        Ids zendesk doesn't return (deleted users) are cached as
+        None so they aren't requested again one by one."""
+        missing = [user_id for user_id in user_ids if user_id not in self._user_cache]
+        for start in range(0, len(missing), 100):
+            chunk = missing[start:start+100]
+            self.get_many_users(",".join(map(str, chunk)))
+            for user_id in chunk:
+                self._user_cache.setdefault(user_id, None)
+
+    def get_incremental_tickets(self, start_time=0):
+        """Yield batches of tickets from zendesk's cursor-based
+        incremental export.
+
+        Each batch holds up to 1000 tickets, ten times what the
+        regular listing returns per page, and no separate count
+        request is needed. Follows after_cursor until zendesk
+        reports end_of_stream."""
+        request = f"{self._incremental_url}?start_time={start_time}"
+        while True:
+            response = self.http_call(request)
+            page = _parse(response)
+            yield page["tickets"]
+            if page["end_of_stream"]:
+                break
+            request = f"{self._incremental_url}?cursor={page['after_cursor']}"
 
     def get_all_ticket_ids(self):
         """"Function to just get all the ticket ids on zendesk as a list"""
-        ticket_range = self.ticket_range()
         all_ticket_ids = []
-        for i in range(1, ticket_range):
-            tickets = self.get_list_of_tickets(i)
-            for ticket in tickets["tickets"]:
+        for tickets in self.get_incremental_tickets():
+            for ticket in tickets:
                 all_ticket_ids.append(ticket["id"])
         return all_ticket_ids
 
@@ -173,8 +303,11 @@ class Zentosam(object):
         the default_requester is used. Samanage requires
         a requester in its tickets.
 
-    If dump argument is True a JSON dump of the information
-    that is transfered  will be created as ticket_dump.json.
+    If dump argument is True a dump of the information that is
+    transfered will be created as ticket_dump.jsonl, one JSON
+    object per line. The file is opened once and kept open for
+    the whole run; call close() when done, or use the class as a
+    context manager.
 
     Both, either or neither (if you don't want to get any results)
     of the samanage or dump arguments need to be set. Running the code
@@ -190,54 +323,108 @@ class Zentosam(object):
         if self.samanage and default_requester is None:
             self.default_requester = input("Input Samanage default requester: ")
         self.dump = dump
+        self._dump_fh = open("ticket_dump.jsonl", "ab") if dump else None
+        # Per-ticket author lookups and comment posts are independent
+        # of each other, so they are spread over worker threads
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=16)
+
+    def close(self):
+        """Shut down the worker pool and close the dump file
+        if one was opened."""
+        self._pool.shutdown()
+        if self._dump_fh is not None:
+            self._dump_fh.close()
+            self._dump_fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
 
     def batch_transfer(self):
-        """Transfer all tickets from zendesk to samanage."""
-        ticket_range = self.zendesk.ticket_range()
-        for i in range(1, ticket_range):
-            tickets = self.zendesk.get_list_of_tickets(i)
-            for ticket in tickets["tickets"]:
-                ticket_id = ticket["id"]
-                self.transfer_ticket(ticket_id)
+        """Transfer all tickets from zendesk to samanage.
+
+        Tickets come from the cursor-based incremental export, 1000
+        per batch. The export already carries the full ticket rows,
+        so they are handed straight to _transfer_ticket_obj without
+        being fetched a second time.
+
+        Comments for the whole batch are fetched up front so the
+        unique assignee and author ids can be loaded into the user
+        cache through show_many, one request per 100 users instead
+        of one per lookup."""
+        for tickets in self.zendesk.get_incremental_tickets():
+            if not (self.samanage or self.dump):
+                # Nothing consumes the comments or users, so don't
+                # prefetch them
+                for ticket in tickets:
+                    self._transfer_ticket_obj(ticket)
+                continue
+            all_comments = list(self._pool.map(
+                self.zendesk.get_comments, [ticket["id"] for ticket in tickets]))
+            user_ids = {ticket["assignee_id"] for ticket in tickets
+                        if ticket["assignee_id"] is not None}
+            for comments in all_comments:
+                for comment in comments["comments"]:
+                    user_ids.add(comment["author_id"])
+            self.zendesk.prefetch_users(user_ids)
+            for ticket, comments in zip(tickets, all_comments):
+                self._transfer_ticket_obj(ticket, comments)
 
     def transfer_ticket(self, ticket_id):
         """Transfer a ticket from zendesk
         to samanage using the zendesk ticket id."""
         ticket = self.zendesk.get_ticket(ticket_id)
-        subject = ticket["ticket"]["subject"]
-        status = ticket["ticket"]["status"]
-        description = ticket["ticket"]["description"]
-        if ticket["ticket"]["assignee_id"] is not None:
-            assignee_email = self.zendesk.get_assignee_email(ticket["ticket"]["assignee_id"])
+        self._transfer_ticket_obj(ticket["ticket"])
+
+    def _transfer_ticket_obj(self, ticket, comments=None):
+        """Transfer an already-fetched zendesk ticket to samanage.
+
+        Takes the ticket dict found inside zendesk ticket responses,
+        so callers that already hold the payload (page listings,
+        show_many) don't trigger another GET for it. The comment
+        response can be passed in too when the caller prefetched it."""
+        ticket_id = ticket["id"]
+        subject = ticket["subject"]
+        status = ticket["status"]
+        description = ticket["description"]
+        # Unassigned tickets used to leave assignee_email undefined and
+        # crash further down; default to None and only look the email
+        # up when the incident or the dump will carry it
+        assignee_email = None
+        if ticket["assignee_id"] is not None and (self.samanage or self.dump):
+            assignee_email = self.zendesk.get_assignee_email(ticket["assignee_id"])
         try:
-            requester = ticket["ticket"]["via"]["source"]["from"]["address"]
+            requester = ticket["via"]["source"]["from"]["address"]
         except KeyError:
             requester = self.default_requester
-        # Terms for the status of a ticket on Samanage differ from those on Zendesk
-        # When creating a ticket on Samanage through API only statuses allowed are Closed and New.
-        # After the ticket is created status can be changed.
-        if status in ("open", "pending"):
-            status = "New"
-            update_status = "Assigned"
-        if status in ("closed", "solved"):
-            status = "Closed"
-            update_status = "Closed"
+        status, update_status = _STATUS_MAP.get(status, ("New", "Assigned"))
         # We can now make incident on Samanage
         if self.samanage:
             incident = self.samanage.incident(
                 subject, requester, self.priority, status, assignee_email, description
             )
-            incident_id = json.loads(incident)["id"]
-        # Get all comments for a ticket on zendesk
-        comments = self.zendesk.get_comments(ticket_id)
+            incident_id = orjson.loads(incident)["id"]
+        # Comments and their authors are only fetched when they have
+        # somewhere to go
         comment_list = []
-        for comment in comments["comments"]:
-            author = self.zendesk.get_comment_author(comment["author_id"])
+        if self.samanage or self.dump:
+            if comments is None:
+                comments = self.zendesk.get_comments(ticket_id)
+            authors = list(self._pool.map(
+                self.zendesk.get_comment_author,
+                [comment["author_id"] for comment in comments["comments"]]))
             if self.dump:
-                comment_list.append({"author": author, "body": comment["body"]})
-            # Transfer comment(s) to Samanage
+                comment_list = [{"author": author, "body": comment["body"]}
+                                for author, comment in zip(authors, comments["comments"])]
+            # Transfer comment(s) to Samanage, posted in parallel over
+            # the worker threads
             if self.samanage:
-                self.samanage.comment("From:{0}\n{1}".format(author, comment["body"]), incident_id)
+                list(self._pool.map(
+                    lambda pair: self.samanage.comment(
+                        f"From:{pair[0]}\n{pair[1]['body']}", incident_id),
+                    zip(authors, comments["comments"])))
         # Adding comments to samanage ticket reopens it
         # (re)update the status of the ticket on samanage to specified status
         if self.samanage:
@@ -245,14 +432,365 @@ class Zentosam(object):
 
         # JSON dump if initalized
         if self.dump:
-            with open("ticket_dump.json", "a", errors='replace') as dump_file:
-                card_details = {ticket_id:{
-                    "id": ticket_id,
-                    "subject": subject,
-                    "requester": requester,
-                    "status": status,
-                    "assignee": assignee_email,
-                    "description": description,
-                    "comments": comment_list}}
-                dump_file.write(json.dumps(card_details, ensure_ascii=False,
-                                           sort_keys=True, indent=4))
+            # orjson only takes string dict keys; stdlib json used to
+            # coerce the id, so keep the record keyed by str(ticket_id)
+            card_details = {str(ticket_id):{
+                "id": ticket_id,
+                "subject": subject,
+                "requester": requester,
+                "status": status,
+                "assignee": assignee_email,
+                "description": description,
+                "comments": comment_list}}
+            self._dump_fh.write(orjson.dumps(card_details) + b"\n")
+
+
+class AsyncZendesk(object):
+    """Async version of the Zendesk class built on aiohttp.
+
+    The transfer workload is almost entirely time spent waiting on
+    the network, so requests that don't depend on each other are
+    sent concurrently with asyncio.gather. A semaphore caps the
+    number of in-flight requests so Zendesk's rate-limit isn't
+    hit straight away.
+
+    Use as an async context manager so the aiohttp session is
+    opened and closed properly:
+
+        async with AsyncZendesk(user, password, org) as zendesk:
+            ...
+
+    Requires the aiohttp package."""
+    def __init__(self, username, password, org, token=False, concurrency=20):
+        if aiohttp is None:
+            raise ImportError("AsyncZendesk requires the aiohttp package")
+        self.username = username
+        self.password = password
+        self.token = token
+        self.uri = f"https://{org}.zendesk.com/api/v2"
+        self._tickets_url = f"{self.uri}/tickets"
+        self._users_url = f"{self.uri}/users"
+        self._incremental_url = f"{self.uri}/incremental/tickets/cursor.json"
+        self.concurrency = concurrency
+        self.session = None
+        self.semaphore = None
+        self._user_cache = {}
+        self._user_locks = {}
+        self._ticket_range = None
+        self._remaining = 999
+
+    async def __aenter__(self):
+        if self.token:
+            auth = aiohttp.BasicAuth(self.username+"/token", self.password)
+        else:
+            auth = aiohttp.BasicAuth(self.username, self.password)
+        self.session = aiohttp.ClientSession(
+            auth=auth,
+            headers={"Content-Type":"application/json"},
+            connector=aiohttp.TCPConnector(limit=50)
+        )
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.session.close()
+
+    async def _retryable_get(self, request):
+        """Make a GET request, retrying on 429 with backoff.
+
+        Same Retry-After/full-jitter handling as Zendesk, with
+        asyncio.sleep instead of time.sleep so other requests keep
+        moving while this one waits out the rate-limit. When
+        X-Rate-Limit-Remaining reports the quota nearly used up,
+        pause before handing out the response."""
+        response = await self.session.get(request)
+        attempts = 0
+        while response.status == 429 and attempts < 6:
+            delay = _retry_delay(response, attempts)
+            attempts = attempts + 1
+            response.release()
+            await asyncio.sleep(delay)
+            response = await self.session.get(request)
+        response.raise_for_status()
+        self._remaining = int(response.headers.get("X-Rate-Limit-Remaining", 999))
+        if self._remaining < 10:
+            await asyncio.sleep(1.0)
+        return response
+
+    async def http_call(self, request):
+        """Make an HTTP GET request to Zendesk."""
+        async with self.semaphore:
+            response = await self._retryable_get(request)
+            content = await response.read()
+            response.release()
+        return orjson.loads(content)
+
+    async def ticket_range(self):
+        """Zendesk returns 100 tickets at a time. With this request we
+        can calculate how many times we'd need to make a
+        self.get_list_of_tickets request.
+
+        Returns the number of pages, so loop with
+        range(1, ticket_range + 1). The count is only fetched once
+        and cached for the rest of the run."""
+        if self._ticket_range is None:
+            response = await self.http_call(f"{self._tickets_url}.json")
+            self._ticket_range = math.ceil(response["count"] / 100)
+        return self._ticket_range
+
+    async def get_ticket(self, ticket_id):
+        """Get a single ticket from Zendesk using the ticket id."""
+        return await self.http_call(f"{self._tickets_url}/{ticket_id}.json")
+
+    async def _get_user(self, user_id):
+        """Get a user from Zendesk, caching the result.
+
+        Same caching as Zendesk._get_user, including 404s as None.
+        A per-id lock makes concurrent lookups of the same user wait
+        on one request instead of all firing their own."""
+        async with self._user_locks.setdefault(user_id, asyncio.Lock()):
+            if user_id in self._user_cache:
+                return self._user_cache[user_id]
+            try:
+                response = await self.http_call(f"{self._users_url}/{user_id}.json")
+            except aiohttp.ClientResponseError as error:
+                if error.status != 404:
+                    raise
+                user = None
+            else:
+                user = response["user"]
+            self._user_cache[user_id] = user
+            return user
+
+    async def get_assignee_email(self, assignee_id):
+        """Get an assignee email using the assignee id."""
+        user = await self._get_user(assignee_id)
+        return user["email"] if user else None
+
+    async def get_comments(self, ticket_id):
+        """Get all the comments on a ticket using the ticket id."""
+        return await self.http_call(f"{self._tickets_url}/{ticket_id}/comments.json")
+
+    async def get_list_of_tickets(self, page=1):
+        """Get a list of tickets up to 100. Page argument used to view next 100."""
+        return await self.http_call(f"{self._tickets_url}.json?page={page}")
+
+    async def get_comment_author(self, author_id):
+        """Get the author of a comment using the author id."""
+        user = await self._get_user(author_id)
+        return user["name"] if user else None
+
+    async def get_many_tickets(self, tickets):
+        """Get many tickets from zendesk. Up to 100."""
+        return await self.http_call(f"{self._tickets_url}/show_many.json?ids={tickets}")
+
+    async def get_many_users(self, users):
+        """Get many users from zendesk. Up to 100.
+
+        Fetched users go into the user cache, same as
+        Zendesk.get_many_users."""
+        response = await self.http_call(f"{self._users_url}/show_many.json?ids={users}")
+        users = response["users"]
+        for user in users:
+            self._user_cache[user["id"]] = user
+        return users
+
+    async def prefetch_users(self, user_ids):
+        """Load a batch of users into the cache with one
+        show_many request per 100 ids, chunks fetched concurrently.
+
+        Ids zendesk doesn't return (deleted users) are cached as
+        None so they aren't requested again one by one."""
+        missing = [user_id for user_id in user_ids if user_id not in self._user_cache]
+        chunks = [missing[start:start+100] for start in range(0, len(missing), 100)]
+        await asyncio.gather(
+            *(self.get_many_users(",".join(map(str, chunk))) for chunk in chunks))
+        for user_id in missing:
+            self._user_cache.setdefault(user_id, None)
+
+    async def get_incremental_tickets(self, start_time=0):
+        """Yield batches of tickets from zendesk's cursor-based
+        incremental export.
+
+        Async version of Zendesk.get_incremental_tickets. The cursor
+        chain is inherently serial, but each call returns up to 1000
+        tickets so far fewer round-trips are needed."""
+        request = f"{self._incremental_url}?start_time={start_time}"
+        while True:
+            page = await self.http_call(request)
+            yield page["tickets"]
+            if page["end_of_stream"]:
+                break
+            request = f"{self._incremental_url}?cursor={page['after_cursor']}"
+
+    async def get_all_ticket_ids(self):
+        """"Function to just get all the ticket ids on zendesk as a list"""
+        all_ticket_ids = []
+        async for tickets in self.get_incremental_tickets():
+            for ticket in tickets:
+                all_ticket_ids.append(ticket["id"])
+        return all_ticket_ids
+
+
+class AsyncZentosam(object):
+    """Async version of the Zentosam class.
+
+    Takes an AsyncZendesk instead of a Zendesk. The samanage argument
+    is still the plain Samanage class; aiohttp has no HTTP Digest
+    support so Samanage calls are run in worker threads with
+    asyncio.to_thread instead. Arguments otherwise behave as they
+    do on Zentosam.
+
+    Tickets on a page are transfered concurrently, and within a
+    ticket the assignee and comment-author lookups are made
+    concurrently too."""
+    def __init__(self, zendesk, samanage=False, priority=None, default_requester=None, dump=False):
+        self.zendesk = zendesk
+        self.samanage = samanage
+        self.priority = priority
+        self.default_requester = default_requester
+        if self.samanage and self.priority is None:
+            self.priority = input("Input Samanage priority: ")
+        if self.samanage and default_requester is None:
+            self.default_requester = input("Input Samanage default requester: ")
+        self.dump = dump
+        self._dump_fh = open("ticket_dump.jsonl", "ab") if dump else None
+
+    def close(self):
+        """Close the dump file if one was opened."""
+        if self._dump_fh is not None:
+            self._dump_fh.close()
+            self._dump_fh = None
+
+    async def batch_transfer(self, consumers=10):
+        """Transfer all tickets from zendesk to samanage.
+
+        Tickets come from the cursor-based incremental export, 1000
+        per batch, and the export already carries the full ticket
+        rows, so they are handed straight to _transfer_ticket_obj
+        without a per-ticket GET.
+
+        A producer coroutine walks the export and feeds individual
+        tickets into a bounded queue while a pool of consumer tasks
+        transfers them, so fetching and prefetching the next batch
+        overlaps with processing the current one instead of the two
+        taking turns. The consumers argument sets the pool size;
+        keep it in line with zendesk's rate limit.
+
+        Comments for the whole batch are gathered up front so the
+        unique assignee and author ids can be loaded into the user
+        cache through show_many, one request per 100 users instead
+        of one per lookup."""
+        queue = asyncio.Queue(maxsize=200)
+
+        async def producer():
+            async for tickets in self.zendesk.get_incremental_tickets():
+                if not (self.samanage or self.dump):
+                    # Nothing consumes the comments or users, so
+                    # don't prefetch them
+                    for ticket in tickets:
+                        await queue.put((ticket, None))
+                    continue
+                all_comments = await asyncio.gather(
+                    *(self.zendesk.get_comments(ticket["id"]) for ticket in tickets))
+                user_ids = {ticket["assignee_id"] for ticket in tickets
+                            if ticket["assignee_id"] is not None}
+                for comments in all_comments:
+                    for comment in comments["comments"]:
+                        user_ids.add(comment["author_id"])
+                await self.zendesk.prefetch_users(user_ids)
+                for ticket, comments in zip(tickets, all_comments):
+                    await queue.put((ticket, comments))
+            # One sentinel per consumer so they all shut down
+            for _ in range(consumers):
+                await queue.put(None)
+
+        async def consumer():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                ticket, comments = item
+                await self._transfer_ticket_obj(ticket, comments)
+
+        await asyncio.gather(producer(), *(consumer() for _ in range(consumers)))
+
+    async def transfer_ticket(self, ticket_id):
+        """Transfer a ticket from zendesk
+        to samanage using the zendesk ticket id."""
+        ticket = await self.zendesk.get_ticket(ticket_id)
+        await self._transfer_ticket_obj(ticket["ticket"])
+
+    async def _transfer_ticket_obj(self, ticket, comments=None):
+        """Transfer an already-fetched zendesk ticket to samanage.
+
+        Takes the ticket dict found inside zendesk ticket responses,
+        same as Zentosam._transfer_ticket_obj. The comment response
+        can be passed in too when the caller prefetched it."""
+        ticket_id = ticket["id"]
+        subject = ticket["subject"]
+        status = ticket["status"]
+        description = ticket["description"]
+        # Unassigned tickets used to leave assignee_email undefined and
+        # crash further down; default to None and only look the email
+        # up when the incident or the dump will carry it
+        assignee_email = None
+        need_comments = self.samanage or self.dump
+        if comments is None and need_comments:
+            # The assignee lookup and the comment list don't depend
+            # on each other, fetch both at once
+            if ticket["assignee_id"] is not None:
+                assignee_email, comments = await asyncio.gather(
+                    self.zendesk.get_assignee_email(ticket["assignee_id"]),
+                    self.zendesk.get_comments(ticket_id)
+                )
+            else:
+                comments = await self.zendesk.get_comments(ticket_id)
+        elif need_comments and ticket["assignee_id"] is not None:
+            assignee_email = await self.zendesk.get_assignee_email(ticket["assignee_id"])
+        try:
+            requester = ticket["via"]["source"]["from"]["address"]
+        except KeyError:
+            requester = self.default_requester
+        status, update_status = _STATUS_MAP.get(status, ("New", "Assigned"))
+        if self.samanage:
+            incident = await asyncio.to_thread(
+                self.samanage.incident,
+                subject, requester, self.priority, status, assignee_email, description
+            )
+            incident_id = orjson.loads(incident)["id"]
+        # Comments and their authors are only fetched when they have
+        # somewhere to go
+        comment_list = []
+        if need_comments:
+            authors = await asyncio.gather(
+                *(self.zendesk.get_comment_author(comment["author_id"])
+                  for comment in comments["comments"])
+            )
+            if self.dump:
+                comment_list = [{"author": author, "body": comment["body"]}
+                                for author, comment in zip(authors, comments["comments"])]
+            # Transfer comment(s) to Samanage, all posted at once;
+            # the session's pooled connections carry them in parallel
+            if self.samanage:
+                await asyncio.gather(
+                    *(asyncio.to_thread(
+                        self.samanage.comment,
+                        f"From:{author}\n{comment['body']}", incident_id)
+                      for author, comment in zip(authors, comments["comments"]))
+                )
+        if self.samanage:
+            await asyncio.to_thread(self.samanage.update_status, update_status, incident_id)
+
+        if self.dump:
+            # orjson only takes string dict keys; stdlib json used to
+            # coerce the id, so keep the record keyed by str(ticket_id)
+            card_details = {str(ticket_id):{
+                "id": ticket_id,
+                "subject": subject,
+                "requester": requester,
+                "status": status,
+                "assignee": assignee_email,
+                "description": description,
+                "comments": comment_list}}
+            self._dump_fh.write(orjson.dumps(card_details) + b"\n")